@@ -21,9 +21,17 @@
 #
 ############################################################################
 
+import hashlib
+import math
 import os
+import subprocess
+import urllib.error
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from time import sleep
 import grass.script as grass
+from osgeo import gdal, ogr, osr
 
 from grass_gis_helpers.general import set_nprocs
 from grass_gis_helpers.location import (
@@ -31,7 +39,6 @@ from grass_gis_helpers.location import (
     create_tmp_location,
 )
 from grass_gis_helpers.open_geodata_germany.download_data import (
-    download_data_using_threadpool,
     extract_compressed_files,
 )
 from grass_gis_helpers.raster import adjust_raster_resolution, rename_raster
@@ -44,6 +51,19 @@ OPEN_DATA_AVAILABILITY = {
 
 RETRIES = 30
 WAITING_TIME = 10
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# seconds without data after which a download is aborted and retried
+DOWNLOAD_TIMEOUT = 60
+# seconds to wait for the version check of a cached file
+VERSION_CHECK_TIMEOUT = 10
+GDAL_VSICURL_CONFIG = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.tiff,.jp2,.zip",
+    "GDAL_HTTP_MULTIRANGE": "YES",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+    "VSI_CACHE": "TRUE",
+}
 
 
 def setup_parallel_processing(nprocs):
@@ -61,9 +81,127 @@ def setup_parallel_processing(nprocs):
             "GRASS_MESSAGE_FORMAT": "plain",
         },
     )
+    # only read the blocks of remote (COG) DOPs which are needed via HTTP
+    # range requests and avoid directory listings of the remote servers;
+    # settings of the user environment are kept
+    for key, value in GDAL_VSICURL_CONFIG.items():
+        os.environ.setdefault(key, value)
     return nprocs
 
 
+def remove_maps(
+    rm_rasters=None,
+    rm_vectors=None,
+    rm_groups=None,
+    orig_region=None,
+    rm_regions=None,
+):
+    """Remove raster maps, vector maps, groups and saved regions from the
+    current mapset and reset the region to the original region. The existing
+    elements are listed with a single g.list call and removed with at most
+    one g.remove call per element type.
+    Args:
+        rm_rasters (list): Raster maps to remove
+        rm_vectors (list): Vector maps to remove
+        rm_groups (list): Groups to remove
+        orig_region (str): Saved original region to set and remove
+        rm_regions (list): Saved regions to remove
+    """
+    rm_regions = list(rm_regions or [])
+    if orig_region:
+        rm_regions.append(orig_region)
+    existing = grass.parse_command(
+        "g.list",
+        type="group,raster,vector,region",
+        mapset=".",
+        flags="t",
+    )
+    if orig_region and f"region/{orig_region}" in existing:
+        grass.run_command("g.region", region=orig_region)
+    for element, names in (
+        ("group", rm_groups),
+        ("raster", rm_rasters),
+        ("vector", rm_vectors),
+        ("region", rm_regions),
+    ):
+        rm_names = sorted(
+            name for name in set(names or []) if f"{element}/{name}" in existing
+        )
+        if rm_names:
+            grass.run_command(
+                "g.remove",
+                type=element,
+                name=rm_names,
+                flags="f",
+                quiet=True,
+                stderr=subprocess.DEVNULL,
+            )
+
+
+def get_worker_env():
+    """Get the environment for worker modules. The workers switch to their
+    own mapset, so a region override (WIND_OVERRIDE) of the calling module,
+    which only exists in the current mapset, must not be passed on.
+
+    Returns:
+        (dict): Environment for worker modules
+    """
+    env = os.environ.copy()
+    env.pop("WIND_OVERRIDE", None)
+    return env
+
+
+def queue_workers(queue, build_worker, params, max_workers=8):
+    """Build the worker modules in a thread pool and put each one into the
+    queue as soon as it is built. So the setup of the remaining workers
+    (e.g. reading the resolution of remote DOPs) overlaps with the workers
+    which are already running.
+
+    Args:
+        queue (ParallelModuleQueue): Queue to run the worker modules
+        build_worker (function): Function which returns the worker module
+                                 (not yet run) for a parameter dictionary
+        params (list): Parameter dictionaries of the workers
+        max_workers (int): Number of threads to build the worker modules
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(build_worker, param) for param in params]
+        for future in as_completed(futures):
+            queue.put(future.result())
+
+
+def adjust_resolution_of_bands(raster_name, resolution, bands=(1, 2, 3, 4)):
+    """Resample or interpolate the bands of an imported DOP to the
+    resolution if they do not have it yet. The region has to be set with the
+    target resolution before and is not changed here.
+    Args:
+        raster_name (str): Name of raster prefix
+        resolution (float): The resolution to which the bands are resampled
+        bands (tuple): Band numbers of the raster
+    """
+    band_names = [f"{raster_name}.{band}" for band in bands]
+    # all bands of a DOP have the same resolution
+    res_rast = float(grass.raster_info(band_names[0])["nsres"])
+    if res_rast > resolution:
+        module = "r.resamp.interp"
+        params = {"method": "bicubic", "nprocs": 1}
+    elif res_rast < resolution:
+        module = "r.resamp.stats"
+        params = {"method": "median"}
+    else:
+        # bands are already imported with the resolution by r.proj
+        return
+    for band_name in band_names:
+        grass.run_command(
+            module,
+            input=band_name,
+            output=band_name,
+            overwrite=True,
+            quiet=True,
+            **params,
+        )
+
+
 def rescale_to_1_256(prefix, raster_name, extension="num"):
     """Rescale raster from 0 to 255 to 1 to 256
     Args:
@@ -78,8 +216,9 @@ def rescale_to_1_256(prefix, raster_name, extension="num"):
             "blue": 3,
             "nir": 4,
         }
+    # all bands have the same extent, so the region is set only once
+    grass.run_command("g.region", raster=f"{raster_name}.1")
     for name, num in band_dict.items():
-        grass.run_command("g.region", raster=f"{raster_name}.{num}")
         rastername = f"{prefix}_{raster_name}_{name}"
         grass.run_command(
             "r.mapcalc",
@@ -117,7 +256,9 @@ def create_grid_and_tiles_list(
     Returns:
         rm_vectors (list): Extended list of vectors to remove in cleanup
         nummber_tiles (str): Number of tiles overlapping with aoi
-        tiles_list (list): List of tile names overlapping with aoi
+        tiles_list (list): List of tuples with tile name and tile extent
+                           (tuple of floats n, s, e, w) of the tiles
+                           overlapping with aoi
     """
     # check if aoi is smaller than tile size
     if ns_res <= float(tile_size) and ew_res <= float(tile_size):
@@ -156,37 +297,33 @@ def create_grid_and_tiles_list(
     )
     rm_vectors.append(grid_name)
 
-    # create list of tiles
-    tiles_num_list = list(
-        grass.parse_command(
-            "v.db.select",
-            map=grid_name,
-            columns="cat",
-            flags="c",
-            quiet=True,
-        ).keys(),
+    # create list of tiles with their extent in a single pass
+    tiles_bbox = grass.read_command(
+        "v.to.db",
+        map=grid_name,
+        option="bbox",
+        flags="p",
+        quiet=True,
     )
-    number_tiles = len(tiles_num_list)
-
-    grass.message(_(f"Number of tiles: {number_tiles}"))
     tiles_list = []
-    for tile in tiles_num_list:
-        tile_area = f"{fs}_DOP_{tile}"
-        grass.run_command(
-            "v.extract",
-            input=grid_name,
-            where=f"cat == {tile}",
-            output=tile_area,
-            quiet=True,
+    for line in tiles_bbox.splitlines():
+        tile, *bbox = line.split("|")
+        # skip header line
+        if not tile.isdigit():
+            continue
+        tiles_list.append(
+            (f"{fs}_DOP_{tile}", tuple(float(val) for val in bbox)),
         )
-        tiles_list.append(tile_area)
-        rm_vectors.append(tile_area)
+    number_tiles = len(tiles_list)
+
+    grass.message(_(f"Number of tiles: {number_tiles}"))
 
     return rm_vectors, number_tiles, tiles_list
 
 
 def import_dop_from_wms(
     tile_key,
+    tile_extent,
     rastername,
     tile_url,
     resolution_to_import,
@@ -201,6 +338,7 @@ def import_dop_from_wms(
 
     Args:
         tile_key (str): Key of current tile
+        tile_extent (str): Extent of current tile as n,s,e,w
         rastername (str): Name of resulting raster
         tile_url (str): WMS URL to get DOPs from
         resolution_to_import (float): Resolution to resample imported raster to
@@ -216,8 +354,8 @@ def import_dop_from_wms(
         rm_rast (list): Extended list of raster maps to remove in cleanup
     """
     # set region and create variable names
-    grass.run_command("g.region", vector=tile_key)
-    tile_key = tile_key.split("@")[0]
+    north, south, east, west = tile_extent.split(",")
+    grass.run_command("g.region", n=north, s=south, e=east, w=west)
     for name in layer_list:
         if name == cir_band:
             out_tmp = f"{name}_{tile_key}_tmp"
@@ -291,8 +429,338 @@ def import_dop_from_wms(
     )
 
 
+def write_stream(src, out_file, buffer, gzip_stream=False):
+    """Write a readable binary stream to a file reusing one preallocated
+    buffer, so that no new bytes object is allocated per chunk. A gzip
+    compressed stream is decompressed chunk by chunk before writing it; like
+    gunzip, all members of a multi-member gzip stream are decompressed and
+    zero padding after the last member is ignored.
+
+    Args:
+        src (io.BufferedIOBase): Stream to read from (e.g. HTTP response)
+        out_file (io.BufferedIOBase): File opened for binary writing
+        buffer (bytearray): Preallocated buffer used for all chunks
+        gzip_stream (bool): True if the stream is gzip compressed
+    """
+    view = memoryview(buffer)
+    decompressor = (
+        zlib.decompressobj(16 + zlib.MAX_WBITS) if gzip_stream else None
+    )
+    while True:
+        n_bytes = src.readinto(view)
+        if not n_bytes:
+            break
+        if decompressor is None:
+            out_file.write(view[:n_bytes])
+            continue
+        data = view[:n_bytes]
+        while data:
+            if decompressor.eof:
+                # like gunzip ignore zero padding after the last member
+                if not bytes(data).strip(b"\0"):
+                    break
+                # next member of a multi-member gzip stream
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            out_file.write(decompressor.decompress(data))
+            data = decompressor.unused_data
+    if decompressor is not None:
+        out_file.write(decompressor.flush())
+        if not decompressor.eof:
+            msg = "Compressed stream ended before the end-of-stream marker"
+            raise EOFError(msg)
+
+
+def download_file(
+    url,
+    download_dir,
+    max_retries=DOWNLOAD_RETRIES,
+    basename=None,
+):
+    """Download a single file from url to the download directory. Gzip
+    compressed files (.gz) are decompressed while streaming the response, so
+    that no extra unzip step is needed.
+
+    Args:
+        url (str): Url to download data from
+        download_dir (str): Path to directory to download data to
+        max_retries (int): Maximum number of retries for downloading the data
+        basename (str): Name of the downloaded file; defaults to the basename
+                        of the url without .gz extension
+
+    Returns:
+        (str): Path to downloaded (and decompressed) file
+    """
+    url_basename = os.path.basename(url)
+    gz_file = url_basename.endswith(".gz")
+    if basename is None:
+        basename = url_basename[:-3] if gz_file else url_basename
+    out_path = os.path.join(download_dir, basename)
+    tmp_path = f"{out_path}.{os.getpid()}.part"
+    buffer = bytearray(DOWNLOAD_CHUNK_SIZE)
+    for attempt in range(max_retries):
+        try:
+            response = urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT)
+            with response, open(tmp_path, "wb") as out_file:
+                # decompress gzip while receiving the data (no gunzip process
+                # and no compressed copy on disk)
+                write_stream(response, out_file, buffer, gzip_stream=gz_file)
+            os.replace(tmp_path, out_path)
+            return out_path
+        except (urllib.error.URLError, OSError, EOFError, zlib.error):
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            wait_time = 5 * (2**attempt)
+            if attempt == max_retries - 1:
+                grass.fatal(_(f"Download of {url} not working."))
+            grass.warning(
+                _(
+                    f"Download of {url} was not successful. Retry attempt "
+                    f"{attempt + 1}/{max_retries} in {wait_time} seconds.",
+                ),
+            )
+            sleep(wait_time)
+    return out_path
+
+
+def get_cache_dir():
+    """Get (and create) the cache directory of r.dop.import
+
+    Returns:
+        (str): Path to cache directory
+    """
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME",
+        os.path.join(os.path.expanduser("~"), ".cache"),
+    )
+    cache_dir = os.path.join(cache_home, "r.dop.import")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_remote_version(url):
+    """Get the version of a remote file from its ETag or Last-Modified header
+
+    Args:
+        url (str): Url of the remote file
+
+    Returns:
+        (str): ETag or Last-Modified header, empty string if the server sends
+               none of them and None if the request failed
+    """
+    request = urllib.request.Request(url, method="HEAD")
+    try:
+        with urllib.request.urlopen(
+            request,
+            timeout=VERSION_CHECK_TIMEOUT,
+        ) as response:
+            return (
+                response.headers.get("ETag")
+                or response.headers.get("Last-Modified")
+                or ""
+            )
+    except (urllib.error.URLError, OSError):
+        return None
+
+
+def get_cached_tindex(tindex_url):
+    """Get the tile index from the cache directory and only download it if it
+    is not cached yet or has changed on the server
+
+    Args:
+        tindex_url (str): URL of tile index
+
+    Returns:
+        (str): Path to the cached tile index
+    """
+    url_hash = hashlib.sha256(tindex_url.encode("utf-8")).hexdigest()
+    cache_dir = get_cache_dir()
+    tindex_gpkg = os.path.join(cache_dir, f"{url_hash}.gpkg")
+    version_file = f"{tindex_gpkg}.version"
+
+    remote_version = get_remote_version(tindex_url)
+    if os.path.isfile(tindex_gpkg):
+        if remote_version is None:
+            grass.warning(
+                _(
+                    f"Tindex {tindex_url} not reachable, using cached "
+                    "tindex.",
+                ),
+            )
+            return tindex_gpkg
+        if remote_version and os.path.isfile(version_file):
+            with open(version_file, encoding="utf-8") as file:
+                cached_version = file.read().strip()
+            if cached_version == remote_version:
+                grass.message(_("Using cached tindex."))
+                return tindex_gpkg
+
+    download_file(tindex_url, cache_dir, basename=os.path.basename(tindex_gpkg))
+    grass.message(_("Tindex download was successful."))
+    if remote_version:
+        with open(version_file, "w", encoding="utf-8") as file:
+            file.write(remote_version)
+    elif os.path.isfile(version_file):
+        os.remove(version_file)
+    return tindex_gpkg
+
+
+def get_aoi_geometry(aoi):
+    """Get the geometry of the AOI vector map as OGR geometry in the
+    projection of the current location
+
+    Args:
+        aoi (str): Name of the AOI vector map
+
+    Returns:
+        (ogr.Geometry): Union of all areas of the AOI
+    """
+    aoi_wkt = grass.read_command(
+        "v.out.ascii",
+        input=aoi,
+        type="area",
+        format="wkt",
+        quiet=True,
+    )
+    aoi_geom = ogr.Geometry(ogr.wkbMultiPolygon)
+    for wkt in aoi_wkt.splitlines():
+        if wkt.strip():
+            aoi_geom = aoi_geom.Union(ogr.CreateGeometryFromWkt(wkt))
+    location_srs = osr.SpatialReference()
+    location_srs.ImportFromWkt(grass.read_command("g.proj", flags="w"))
+    location_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    aoi_geom.AssignSpatialReference(location_srs)
+    return aoi_geom
+
+
+def get_tindex_locations(tindex_url, aoi, column="location"):
+    """Get the locations of the tile index (from cache if unchanged) which
+    overlap with the AOI. The tile index is read directly with OGR, so it
+    does not need to be imported into GRASS.
+
+    Args:
+        tindex_url (str): URL of tile index
+        aoi (str): Name of the AOI vector map
+        column (str): Name of the attribute column to read from the tindex
+
+    Returns:
+        (dict): Column values of tindex features which overlap with the AOI
+                as keys and the envelope (minx, maxx, miny, maxy) of the
+                features as values
+    """
+    tindex_gpkg = get_cached_tindex(tindex_url)
+    tindex_ds = ogr.Open(tindex_gpkg)
+    if tindex_ds is None:
+        grass.fatal(_(f"Tindex {tindex_gpkg} could not be opened."))
+    layer = tindex_ds.GetLayer()
+
+    aoi_geom = get_aoi_geometry(aoi)
+    tindex_srs = layer.GetSpatialRef()
+    if tindex_srs is not None:
+        tindex_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        aoi_geom.TransformTo(tindex_srs)
+    layer.SetSpatialFilter(aoi_geom)
+
+    tiles = {}
+    for feature in layer:
+        tile_geom = feature.GetGeometryRef()
+        if aoi_geom.Intersects(tile_geom) and not aoi_geom.Touches(tile_geom):
+            tiles[feature.GetField(column)] = tile_geom.GetEnvelope()
+    return tiles
+
+
+def create_tile_batches(tiles, metatile_size=4):
+    """Group spatially adjacent tiles into metatiles of
+    metatile_size x metatile_size tiles, so that a single worker imports
+    several tiles at once
+
+    Args:
+        tiles (dict): Tile urls as keys and their envelope
+                      (minx, maxx, miny, maxy) as values
+        metatile_size (int): Number of tiles per metatile in each direction
+
+    Returns:
+        (list): List with the tile urls of each metatile
+    """
+    metatiles = {}
+    for url, (minx, maxx, miny, maxy) in tiles.items():
+        metatile_key = (
+            math.floor((minx + maxx) / 2 / (metatile_size * (maxx - minx))),
+            math.floor((miny + maxy) / 2 / (metatile_size * (maxy - miny))),
+        )
+        metatiles.setdefault(metatile_key, []).append(url)
+    return [metatiles[metatile_key] for metatile_key in sorted(metatiles)]
+
+
+def build_tile_vrt(tile_urls, vrt_path):
+    """Build a GDAL VRT of the tiles of a metatile. GDAL only warns if it
+    skips a tile (e.g. not readable or other SRS), so the warnings are
+    collected to not import incomplete metatiles.
+
+    Args:
+        tile_urls (list): Urls of the tiles of the metatile
+        vrt_path (str): Path of the VRT file to write
+    """
+    vrt_errors = []
+
+    def collect_vrt_errors(err_class, err_no, err_msg):
+        if err_class >= gdal.CE_Warning:
+            vrt_errors.append(err_msg)
+
+    gdal.PushErrorHandler(collect_vrt_errors)
+    try:
+        vrt_ds = gdal.BuildVRT(vrt_path, tile_urls)
+    finally:
+        gdal.PopErrorHandler()
+    if vrt_ds is None or vrt_errors:
+        grass.fatal(
+            _(
+                f"VRT for the tiles {tile_urls} could not be created: "
+                f"{' '.join(vrt_errors)}",
+            ),
+        )
+    # write and close the VRT before it is used by the worker
+    vrt_ds.FlushCache()
+    del vrt_ds
+
+
+def create_vrt(input_raster_list, output):
+    """Create a VRT raster map out of the raster maps of the worker mapsets.
+    The raster maps are copied to the current mapset, because the worker
+    mapsets are removed in cleanup. A single raster map is copied directly
+    to the output name without building a VRT.
+
+    Args:
+        input_raster_list (list): Raster maps with mapset (name@mapset)
+        output (str): Name of the output (vrt) raster map
+    """
+    if len(input_raster_list) == 1:
+        grass.run_command(
+            "g.copy",
+            raster=f"{input_raster_list[0]},{output}",
+            quiet=True,
+            overwrite=True,
+        )
+        return
+    raster_list = []
+    for rast in input_raster_list:
+        rast_wo_mapsetname = rast.split("@")[0]
+        grass.run_command(
+            "g.copy",
+            raster=f"{rast},{rast_wo_mapsetname}",
+            quiet=True,
+        )
+        raster_list.append(rast_wo_mapsetname)
+    grass.run_command(
+        "r.buildvrt",
+        input=raster_list,
+        output=output,
+        quiet=True,
+        overwrite=True,
+    )
+
+
 def keep_data_nw(url, download_dir):
-    """Download and keep DOPs for NW from url using threadpool
+    """Download and keep DOPs for NW from url
 
     Args:
         url (string): Url to download data from
@@ -302,14 +770,11 @@ def keep_data_nw(url, download_dir):
         (str): Path to download data
     """
     url = url.replace("/vsicurl/", "")
-    basename = os.path.basename(url)
-    download_data_using_threadpool([url], download_dir, None)
-
-    return os.path.join(download_dir, basename)
+    return download_file(url, download_dir)
 
 
 def keep_data_bb_be(url, download_dir):
-    """Download and keep DOPs for BB/BE from url using threadpool
+    """Download and keep DOPs for BB/BE from url
 
     Args:
         url (string): Url to download data from
@@ -321,13 +786,13 @@ def keep_data_bb_be(url, download_dir):
     url = url.replace("/vsizip/vsicurl/", "")
     basename = os.path.basename(url)
     url = url.replace(basename, "")[:-1]
-    download_data_using_threadpool([url], download_dir, None)
+    download_file(url, download_dir)
     extract_compressed_files([basename.replace(".tif", ".zip")], download_dir)
     return os.path.join(download_dir, basename)
 
 
 def keep_data_sn(url, download_dir):
-    """Download and keep DOPs for BB/BE from url using threadpool
+    """Download and keep DOPs for BB/BE from url
 
     Args:
         url (string): Url to download data from
@@ -339,7 +804,7 @@ def keep_data_sn(url, download_dir):
     basename = os.path.basename(url)
     print(basename)
     url = os.path.dirname(url.replace("/vsizip/vsicurl/", ""))
-    download_data_using_threadpool([url], download_dir, None)
+    download_file(url, download_dir)
     extract_compressed_files([os.path.basename(url)], download_dir)
 
     return os.path.join(download_dir, basename)
@@ -489,6 +954,29 @@ def import_and_reproject(
     else:
         grass.run_command("g.region", res=res, flags="a")
 
+    # restrict the region to the window of the AOI which is covered by the
+    # imported DOP (aligned to the resolution), so that only this window is
+    # reprojected and later resampled instead of the entire AOI
+    proj_bounds = grass.read_command(
+        "r.proj",
+        mapset="PERMANENT",
+        input=f"{raster_name}.1",
+        flags="g",
+        quiet=True,
+        **{loc_proj: tmp_loc},
+    )
+    bounds = dict(item.split("=") for item in proj_bounds.split())
+    reg = grass.region()
+    grass.run_command(
+        "g.region",
+        n=min(reg["n"], float(bounds["n"])),
+        s=max(reg["s"], float(bounds["s"])),
+        e=min(reg["e"], float(bounds["e"])),
+        w=max(reg["w"], float(bounds["w"])),
+        res=res,
+        flags="a",
+    )
+
     for i in range(1, 5):
         name = f"{raster_name}.{i}"
         # set memory manually to 1000
@@ -86,7 +86,6 @@ from grass_gis_helpers.cleanup import general_cleanup
 from grass_gis_helpers.open_geodata_germany.download_data import (
     check_download_dir,
 )
-from grass_gis_helpers.raster import create_vrt
 
 # import module library
 path = get_lib_path(modname="r.dop.import")
@@ -95,14 +94,19 @@ if path is None:
 sys.path.append(path)
 try:
     from r_dop_import_lib import (
+        get_worker_env,
+        queue_workers,
         setup_parallel_processing,
         create_grid_and_tiles_list,
+        create_vrt,
+        remove_maps,
     )
 except Exception as imp_err:
     grass.fatal(f"r.dop.import library could not be imported: {imp_err}")
 
 ID = grass.tempname(12)
 ORIG_REGION = f"original_region_{ID}"
+BANDS = ("red", "green", "blue", "nir")
 rm_rasters = []
 rm_vectors = []
 download_dir = None
@@ -114,12 +118,32 @@ NATIVE_DOP_RES = 0.2
 
 def cleanup():
     """Remove all not needed files at the end"""
-    general_cleanup(
-        orig_region=ORIG_REGION,
+    remove_maps(
         rm_rasters=rm_rasters,
         rm_vectors=rm_vectors,
-        rm_dirs=rm_dirs,
+        orig_region=ORIG_REGION,
+    )
+    general_cleanup(rm_dirs=rm_dirs)
+
+
+def build_worker(param):
+    """Build the r.dop.import.worker.he module for one tile.
+
+    Args:
+        param (dict): Parameters of the worker module
+    Returns:
+        (Module): Worker module which is not run yet
+    """
+    r_dop_import_worker_he = Module(
+        "r.dop.import.worker.he",
+        **param,
+        env_=get_worker_env(),
+        run_=False,
     )
+    # catch all GRASS output to stdout and stderr
+    r_dop_import_worker_he.stdout = grass.PIPE
+    r_dop_import_worker_he.stderr = grass.PIPE
+    return r_dop_import_worker_he
 
 
 def main():
@@ -153,13 +177,9 @@ def main():
             ),
         )
 
-    # create list for each raster band for building entire raster
-    all_raster = {
-        "red": [],
-        "green": [],
-        "blue": [],
-        "nir": [],
-    }
+    # create list of imported tiles (raster name and mapset) for building
+    # entire raster per band
+    imported_tiles = []
 
     # save original region
     grass.run_command("g.region", save=ORIG_REGION, quiet=True)
@@ -221,57 +241,47 @@ def main():
         grass.message(
             _(f"Importing {number_tiles} DOPs for HE in parallel..."),
         )
-        for tile in tiles_list:
+        worker_params = []
+        # parameters which are the same for all tiles
+        pid = os.getpid()
+        base_param = {
+            "orig_region": ORIG_REGION,
+            "flags": "k" if flags["k"] else "",
+        }
+        if aoi:
+            base_param["aoi"] = aoi
+        if options["download_dir"]:
+            base_param["download_dir"] = download_dir
+        if flags["r"]:
+            base_param["resolution_to_import"] = NATIVE_DOP_RES
+        else:
+            base_param["resolution_to_import"] = ns_res
+        for tile, tile_extent in tiles_list:
             key = tile
-            new_mapset = f"tmp_mapset_rdop_import_tile_{key}_{os.getpid()}"
+            new_mapset = f"tmp_mapset_rdop_import_tile_{key}_{pid}"
             rm_dirs.append(os.path.join(gisdbase, location, new_mapset))
             raster_name = tile
-            for item in all_raster.items():
-                item[1].append(
-                    f"{fs}_{raster_name}_{item[0]}@{new_mapset}",
-                )
+            imported_tiles.append((raster_name, new_mapset))
             param = {
-                "flags": "",
+                **base_param,
                 "tile_key": key,
+                "tile_extent": tile_extent,
                 "tile_url": WMS,
                 "raster_name": raster_name,
-                "orig_region": ORIG_REGION,
                 "new_mapset": new_mapset,
             }
             grass.message(f"raster_name: {raster_name}")
-            if aoi:
-                param["aoi"] = aoi
-            if options["download_dir"]:
-                param["download_dir"] = download_dir
-            if flags["k"]:
-                param["flags"] += "k"
-            if flags["r"]:
-                param["resolution_to_import"] = NATIVE_DOP_RES
-            else:
-                param["resolution_to_import"] = ns_res
 
             # append raster bands to download to remove list
-            rm_red = f"{raster_name}_red"
-            rm_green = f"{raster_name}_green"
-            rm_blue = f"{raster_name}_blue"
-            rm_nir = f"{raster_name}_nir"
-            rm_rasters.append(rm_red)
-            rm_rasters.append(rm_green)
-            rm_rasters.append(rm_blue)
-            rm_rasters.append(rm_nir)
-
-            # run worker addon in parallel
-            r_dop_import_worker_he = Module(
-                "r.dop.import.worker.he",
-                **param,
-                run_=False,
-            )
-            # catch all GRASS output to stdout and stderr
-            r_dop_import_worker_he.stdout = grass.PIPE
-            r_dop_import_worker_he.stderr = grass.PIPE
-            queue.put(r_dop_import_worker_he)
+            rm_rasters.extend(f"{raster_name}_{band}" for band in BANDS)
+
+            worker_params.append(param)
+
+        # build the worker modules in parallel and run them as soon as they
+        # are built
+        queue_workers(queue, build_worker, worker_params)
         queue.wait()
-    except Exception:
+    except Exception as err:
         for proc_num in range(queue.get_num_run_procs()):
             proc = queue.get(proc_num)
             if proc.returncode != 0:
@@ -281,11 +291,17 @@ def main():
                 grass.fatal(
                     _(f"\nERROR by processing <{proc.get_bash()}>: {errmsg}"),
                 )
+        # error while building the worker modules
+        grass.fatal(_(f"Setting up the DOP import failed: {err}"))
 
     # create one vrt per band of all imported DOPs
     raster_out = []
-    for band, b_list in all_raster.items():
+    for band in BANDS:
         out = f"{output}_{band}"
+        b_list = [
+            f"{fs}_{raster_name}_{band}@{mapset}"
+            for raster_name, mapset in imported_tiles
+        ]
         create_vrt(b_list, out)
         raster_out.append(out)
 
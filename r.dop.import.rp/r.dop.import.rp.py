@@ -84,15 +84,10 @@ from grass.pygrass.utils import get_lib_path
 from osgeo import gdal
 
 from grass_gis_helpers.cleanup import general_cleanup
-from grass_gis_helpers.data_import import (
-    download_and_import_tindex,
-    get_list_of_tindex_locations,
-)
 from grass_gis_helpers.general import test_memory
 from grass_gis_helpers.open_geodata_germany.download_data import (
     check_download_dir,
 )
-from grass_gis_helpers.raster import create_vrt
 
 # import module library
 path = get_lib_path(modname="r.dop.import")
@@ -100,7 +95,14 @@ if path is None:
     grass.fatal("Unable to find the dop library directory.")
 sys.path.append(path)
 try:
-    from r_dop_import_lib import setup_parallel_processing
+    from r_dop_import_lib import (
+        create_vrt,
+        get_tindex_locations,
+        get_worker_env,
+        queue_workers,
+        remove_maps,
+        setup_parallel_processing,
+    )
 except Exception as imp_err:
     grass.fatal(f"r.dop.import library could not be imported: {imp_err}")
 
@@ -112,6 +114,7 @@ TINDEX = (
 
 ID = grass.tempname(12)
 ORIG_REGION = f"original_region_{ID}"
+BANDS = ("red", "green", "blue", "nir")
 rm_rasters = []
 rm_vectors = []
 download_dir = None
@@ -120,12 +123,39 @@ rm_dirs = []
 
 def cleanup():
     """Remove all not needed files at the end"""
-    general_cleanup(
-        orig_region=ORIG_REGION,
+    remove_maps(
         rm_rasters=rm_rasters,
         rm_vectors=rm_vectors,
-        rm_dirs=rm_dirs,
+        orig_region=ORIG_REGION,
+    )
+    general_cleanup(rm_dirs=rm_dirs)
+
+
+def build_worker(param):
+    """Build the r.dop.import.worker.rp module for one tile. The native
+    resolution of the DOP is read if no resolution to import is given.
+
+    Args:
+        param (dict): Parameters of the worker module
+    Returns:
+        (Module): Worker module which is not run yet
+    """
+    if "resolution_to_import" not in param:
+        # native resolution of the DOP
+        dop_src = gdal.Open(param["tile_url"])
+        if dop_src is None:
+            grass.fatal(_(f"DOP {param['tile_url']} could not be opened."))
+        param["resolution_to_import"] = abs(dop_src.GetGeoTransform()[1])
+    r_dop_import_worker_rp = Module(
+        "r.dop.import.worker.rp",
+        **param,
+        env_=get_worker_env(),
+        run_=False,
     )
+    # catch all GRASS output to stdout and stderr
+    r_dop_import_worker_rp.stdout = grass.PIPE
+    r_dop_import_worker_rp.stderr = grass.PIPE
+    return r_dop_import_worker_rp
 
 
 def main():
@@ -140,13 +170,9 @@ def main():
     # set memory to input if possible
     options["memory"] = test_memory(options["memory"])
 
-    # create list for each raster band for building entire raster
-    all_raster = {
-        "red": [],
-        "green": [],
-        "blue": [],
-        "nir": [],
-    }
+    # create list of imported tiles (raster name and mapset) for building
+    # entire raster per band
+    imported_tiles = []
 
     # save original region
     grass.run_command("g.region", save=ORIG_REGION, quiet=True)
@@ -170,22 +196,17 @@ def main():
             quiet=True,
         )
 
-    # get tile index
-    tindex_vect = f"dop_tindex_{ID}"
-    rm_vectors.append(tindex_vect)
-    download_and_import_tindex(TINDEX, tindex_vect, download_dir)
-
-    # get download urls which overlap with AOI
+    # get download urls from tile index which overlap with AOI
     # or current region if no AOI is given
-    url_tiles = get_list_of_tindex_locations(tindex_vect, aoi)
-
-    for count, value in enumerate(url_tiles, start=1):
-        url_tiles[count - 1] = (count, [value])
+    url_tiles = list(get_tindex_locations(TINDEX, aoi))
     number_tiles = len(url_tiles)
 
     # set number of parallel processes to number of tiles
     if number_tiles < nprocs:
         nprocs = number_tiles
+
+    for count, value in enumerate(url_tiles, start=1):
+        url_tiles[count - 1] = (count, [value])
     queue = ParallelModuleQueue(nprocs=nprocs)
 
     # get GISDBASE and Location
@@ -198,66 +219,46 @@ def main():
         grass.message(
             _(f"Importing {number_tiles} DOPs for RP in parallel..."),
         )
+        worker_params = []
+        # parameters which are the same for all tiles
+        pid = os.getpid()
+        base_param = {
+            "orig_region": ORIG_REGION,
+            "memory": 1000,
+            "flags": "k" if flags["k"] else "",
+        }
+        if aoi:
+            base_param["aoi"] = aoi
+        if options["download_dir"]:
+            base_param["download_dir"] = download_dir
+        if not flags["r"]:
+            base_param["resolution_to_import"] = ns_res
         for tile in url_tiles:
             key = tile[0]
-            new_mapset = f"tmp_mapset_rdop_import_tile_{key}_{os.getpid()}"
+            new_mapset = f"tmp_mapset_rdop_import_tile_{key}_{pid}"
             rm_dirs.append(os.path.join(gisdbase, location, new_mapset))
             b_name = os.path.basename(tile[1][0])
-            raster_name = (
-                f"{b_name.split('.')[0].replace('-', '_')}_{os.getpid()}"
-            )
-            for item in all_raster.items():
-                item[1].append(
-                    f"{fs}_{raster_name}_{item[0]}@{new_mapset}",
-                )
+            raster_name = f"{b_name.split('.')[0].replace('-', '_')}_{pid}"
+            imported_tiles.append((raster_name, new_mapset))
             param = {
+                **base_param,
                 "tile_key": key,
                 "tile_url": tile[1][0],
                 "raster_name": raster_name,
-                "orig_region": ORIG_REGION,
-                "memory": 1000,
                 "new_mapset": new_mapset,
-                "flags": "",
             }
             grass.message(_(f"raster name: {raster_name}"))
 
-            # modify params
-            if aoi:
-                param["aoi"] = aoi
-            if options["download_dir"]:
-                param["download_dir"] = download_dir
-            if flags["k"]:
-                param["flags"] += "k"
-            if flags["r"]:
-                dop_src = gdal.Open(param["tile_url"])
-                param["resolution_to_import"] = abs(
-                    dop_src.GetGeoTransform()[1],
-                )
-            else:
-                param["resolution_to_import"] = ns_res
-
             # append raster bands to download to remove list
-            rm_red = f"{raster_name}_red"
-            rm_green = f"{raster_name}_green"
-            rm_blue = f"{raster_name}_blue"
-            rm_nir = f"{raster_name}_nir"
-            rm_rasters.append(rm_red)
-            rm_rasters.append(rm_green)
-            rm_rasters.append(rm_blue)
-            rm_rasters.append(rm_nir)
-
-            # run worker addon in parallel
-            r_dop_import_worker_rp = Module(
-                "r.dop.import.worker.rp",
-                **param,
-                run_=False,
-            )
-            # catch all GRASS output to stdout and stderr
-            r_dop_import_worker_rp.stdout = grass.PIPE
-            r_dop_import_worker_rp.stderr = grass.PIPE
-            queue.put(r_dop_import_worker_rp)
+            rm_rasters.extend(f"{raster_name}_{band}" for band in BANDS)
+
+            worker_params.append(param)
+
+        # build the worker modules in parallel and run them as soon as they
+        # are built
+        queue_workers(queue, build_worker, worker_params)
         queue.wait()
-    except Exception:
+    except Exception as err:
         for proc_num in range(queue.get_num_run_procs()):
             proc = queue.get(proc_num)
             if proc.returncode != 0:
@@ -267,11 +268,17 @@ def main():
                 grass.fatal(
                     _(f"\nERROR by processing <{proc.get_bash()}>: {errmsg}"),
                 )
+        # error while building the worker modules
+        grass.fatal(_(f"Setting up the DOP import failed: {err}"))
 
     # create one vrt per band of all imported DOPs
     raster_out = []
-    for band, b_list in all_raster.items():
+    for band in BANDS:
         out = f"{output}_{band}"
+        b_list = [
+            f"{fs}_{raster_name}_{band}@{mapset}"
+            for raster_name, mapset in imported_tiles
+        ]
         create_vrt(b_list, out)
         raster_out.append(out)
 
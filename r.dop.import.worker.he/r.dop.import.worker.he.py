@@ -49,6 +49,15 @@
 # % description: Key of tile-DOP to import
 # %end
 
+# %option
+# % key: tile_extent
+# % type: double
+# % required: yes
+# % multiple: yes
+# % key_desc: n,s,e,w
+# % description: Extent of tile-DOP to import
+# %end
+
 # %option
 # % key: tile_url
 # % required: yes
@@ -93,7 +102,6 @@ import sys
 import grass.script as grass
 from grass.pygrass.utils import get_lib_path
 
-from grass_gis_helpers.cleanup import general_cleanup
 from grass_gis_helpers.location import switch_back_original_location
 from grass_gis_helpers.mapset import switch_to_new_mapset
 
@@ -103,7 +111,11 @@ if path is None:
     grass.fatal("Unable to find the dop library directory.")
 sys.path.append(path)
 try:
-    from r_dop_import_lib import rescale_to_1_256, import_dop_from_wms
+    from r_dop_import_lib import (
+        import_dop_from_wms,
+        remove_maps,
+        rescale_to_1_256,
+    )
 except Exception as imp_err:
     grass.fatal(f"r.dop.import library could not be imported: {imp_err}")
 
@@ -116,10 +128,7 @@ WAITING_TIME = 10
 
 def cleanup():
     """Remove all not needed files at the end"""
-    general_cleanup(
-        rm_rasters=rm_rast,
-        rm_groups=rm_group,
-    )
+    remove_maps(rm_rasters=rm_rast, rm_groups=rm_group)
 
 
 def main():
@@ -151,7 +160,8 @@ def main():
     )
     # import DOPs from WMS
     import_dop_from_wms(
-        f"{tile_key }@{old_mapset}",
+        tile_key,
+        options["tile_extent"],
         raster_name,
         tile_url,
         resolution_to_import,
@@ -106,11 +106,10 @@ import sys
 import grass.script as grass
 from grass.pygrass.utils import get_lib_path
 
-from grass_gis_helpers.cleanup import general_cleanup, cleaning_tmp_location
+from grass_gis_helpers.cleanup import cleaning_tmp_location
 from grass_gis_helpers.general import test_memory
 from grass_gis_helpers.location import switch_back_original_location
 from grass_gis_helpers.mapset import switch_to_new_mapset
-from grass_gis_helpers.raster import adjust_raster_resolution
 
 # import module library
 path = get_lib_path(modname="r.dop.import")
@@ -118,7 +117,12 @@ if path is None:
     grass.fatal("Unable to find the dop library directory.")
 sys.path.append(path)
 try:
-    from r_dop_import_lib import rescale_to_1_256, import_and_reproject
+    from r_dop_import_lib import (
+        adjust_resolution_of_bands,
+        import_and_reproject,
+        remove_maps,
+        rescale_to_1_256,
+    )
 except Exception as imp_err:
     grass.fatal(f"r.dop.import library could not be imported: {imp_err}")
 
@@ -138,10 +142,7 @@ def cleanup():
         tmp_gisrc=TMP_GISRC,
         gisdbase=gisdbase,
     )
-    general_cleanup(
-        rm_rasters=rm_rast,
-        rm_groups=rm_group,
-    )
+    remove_maps(rm_rasters=rm_rast, rm_groups=rm_group)
 
 
 def main():
@@ -184,20 +185,9 @@ def main():
         keep_data=keep_data,
     )
 
-    # adjust resolution if required
-    for band in [1, 2, 3, 4]:
-        raster_name_band = f"{raster_name}.{band}"
-        grass.run_command(
-            "g.region",
-            raster=raster_name_band,
-            res=resolution_to_import,
-            flags="a",
-        )
-        adjust_raster_resolution(
-            raster_name_band,
-            raster_name_band,
-            resolution_to_import,
-        )
+    # adjust resolution of all bands if required (the region is already set
+    # to the DOP with the resolution by import_and_reproject)
+    adjust_resolution_of_bands(raster_name, resolution_to_import)
     rm_group.append(raster_name)
     grass.message(_(f"Finishing raster import for {raster_name}..."))
 
@@ -104,9 +104,10 @@ import os
 import sys
 
 import grass.script as grass
+from grass.pygrass.modules import Module, ParallelModuleQueue
 from grass.pygrass.utils import get_lib_path
 
-from grass_gis_helpers.cleanup import general_cleanup
+from grass_gis_helpers.general import set_nprocs
 from grass_gis_helpers.open_geodata_germany.download_data import (
     check_download_dir,
 )
@@ -122,7 +123,7 @@ if path is None:
     grass.fatal("Unable to find the DOP library directory.")
 sys.path.append(path)
 try:
-    from r_dop_import_lib import OPEN_DATA_AVAILABILITY
+    from r_dop_import_lib import OPEN_DATA_AVAILABILITY, remove_maps
 except Exception as imp_err:
     grass.fatal(f"r.dop.import library could not be imported: {imp_err}")
 
@@ -130,16 +131,39 @@ except Exception as imp_err:
 ID = grass.tempname(12)
 ORIG_REGION = f"original_region_{ID}"
 rm_rasters = []
+rm_regions = []
 SUPPORTED = OPEN_DATA_AVAILABILITY["SUPPORTED"]
 NO_OPEN_DATA = OPEN_DATA_AVAILABILITY["NO_OPEN_DATA"]
 NOT_YET_SUPPORTED = OPEN_DATA_AVAILABILITY["NOT_YET_SUPPORTED"]
+# federal state addon and worker addon for federal states which do not
+# follow the r.dop.import.<fs> naming (BB and BE are imported by one addon)
+FS_ADDONS = {
+    "BB": ("r.dop.import.bb.be", "r.dop.import.worker.bb.be"),
+    "BE": ("r.dop.import.bb.be", "r.dop.import.worker.bb.be"),
+}
 
 
 def cleanup():
     """Remove all not needed files at the end"""
-    general_cleanup(
-        orig_region=ORIG_REGION,
+    remove_maps(
         rm_rasters=rm_rasters,
+        orig_region=ORIG_REGION,
+        rm_regions=rm_regions,
+    )
+
+
+def get_fs_addons(fs):
+    """Get the federal state addon and its worker addon
+
+    Args:
+        fs (str): the abbrivation of the federal state
+
+    Returns:
+        (tuple): Name of the federal state addon and of its worker addon
+    """
+    return FS_ADDONS.get(
+        fs,
+        (f"r.dop.import.{fs.lower()}", f"r.dop.import.worker.{fs.lower()}"),
     )
 
 
@@ -189,7 +213,7 @@ def main():
     local_data_dir = options["local_data_dir"]
     download_dir = check_download_dir(options["download_dir"])
     output = options["output"]
-    nprocs = options["nprocs"]
+    nprocs = set_nprocs(options["nprocs"])
     memory = options["memory"]
     keep_data = flags["k"]
     native_res = flags["r"]
@@ -204,7 +228,9 @@ def main():
 
     # loop over federal states and import data
     all_dops = {"red": [], "green": [], "blue": [], "nir": []}
-    for fs in set(federal_states):
+    imported_addons = set()
+    addon_runs = []
+    for fs in dict.fromkeys(federal_states):
         grass.message(_(f"Importing DOPs for {fs}..."))
         # check if local data for federal state given
         imported_local_data = False
@@ -246,35 +272,67 @@ def main():
                         "available. Please use local data <local_data_dir>.",
                     ),
                 )
-            else:
-                r_dop_import_fs_flags = ""
-                if keep_data:
-                    r_dop_import_fs_flags += "k"
-                if native_res:
-                    r_dop_import_fs_flags += "r"
-                # change fs for BB and BE (within one addon)
-                if fs in ["BB", "BE"]:
-                    addon = "r.dop.import.bb.be"
-                    worker_addon = "r.dop.import.worker.bb.be"
-                else:
-                    addon = f"r.dop.import.{fs.lower()}"
-                    worker_addon = f"r.dop.import.worker.{fs.lower()}"
-                params = {
-                    "aoi": aoi,
-                    "download_dir": download_dir,
-                    "output": out_fs,
-                    "memory": memory,
-                    "flags": r_dop_import_fs_flags,
-                    "overwrite": True,
-                }
-                if grass.find_program(worker_addon, "--help"):
-                    params["nprocs"] = nprocs
-                grass.run_command(addon, **params)
+            addon, worker_addon = get_fs_addons(fs)
+            # skip federal state if its addon already imported the AOI
+            # (e.g. BB and BE)
+            if addon in imported_addons:
+                continue
+            imported_addons.add(addon)
+            r_dop_import_fs_flags = ""
+            if keep_data:
+                r_dop_import_fs_flags += "k"
+            if native_res:
+                r_dop_import_fs_flags += "r"
+            params = {
+                "aoi": aoi,
+                "download_dir": download_dir,
+                "output": out_fs,
+                "memory": memory,
+                "flags": r_dop_import_fs_flags,
+                "overwrite": True,
+            }
+            # each addon gets its own region (WIND_OVERRIDE) to not change
+            # the region of the other addons running in this mapset
+            addon_region = f"{ORIG_REGION}_{fs}"
+            grass.run_command("g.region", save=addon_region, quiet=True)
+            rm_regions.append(addon_region)
+            has_worker = grass.find_program(worker_addon, "--help")
+            addon_runs.append((addon, params, addon_region, has_worker))
             all_dops["red"].append(f"{out_fs}_red")
             all_dops["green"].append(f"{out_fs}_green")
             all_dops["blue"].append(f"{out_fs}_blue")
             all_dops["nir"].append(f"{out_fs}_nir")
 
+    # run the addons of the federal states in parallel. The processes are
+    # split between the addons, so that all addons together use at most
+    # nprocs workers. The addons share the mapset, so their temporary vector
+    # maps are written to the same SQLite database (GRASS waits for its
+    # locks). The output of the addons is not piped, so that their messages
+    # are shown while they run.
+    if addon_runs:
+        addon_nprocs = max(1, nprocs // len(addon_runs))
+        queue = ParallelModuleQueue(
+            nprocs=max(1, min(len(addon_runs), nprocs)),
+        )
+        try:
+            for addon, params, addon_region, has_worker in addon_runs:
+                if has_worker:
+                    params["nprocs"] = addon_nprocs
+                addon_env = os.environ.copy()
+                addon_env["WIND_OVERRIDE"] = addon_region
+                queue.put(
+                    Module(addon, **params, env_=addon_env, run_=False),
+                )
+            queue.wait()
+        except Exception as err:
+            for proc_num in range(queue.get_num_run_procs()):
+                proc = queue.get(proc_num)
+                if proc.returncode != 0:
+                    grass.fatal(
+                        _(f"\nERROR by processing <{proc.get_bash()}>"),
+                    )
+            grass.fatal(_(f"Import of the federal states failed: {err}"))
+
     create_vrt(all_dops["red"], f"{output}_red")
     create_vrt(all_dops["green"], f"{output}_green")
     create_vrt(all_dops["blue"], f"{output}_blue")
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+#
+############################################################################
+#
+# MODULE:      r.dop.import library test
+# AUTHOR(S):   mundialis GmbH & Co. KG
+#
+# PURPOSE:     Tests the r.dop.import library functions which do not need
+#              to download data
+# COPYRIGHT:   (C) 2024 by mundialis GmbH & Co. KG and the GRASS
+#              Development Team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#############################################################################
+
+import gzip
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from grass.exceptions import ScriptError
+from grass.gunittest.case import TestCase
+from grass.gunittest.main import test
+from grass.pygrass.utils import get_lib_path
+import grass.script as grass
+from osgeo import gdal, osr
+
+# import module library (installed or from the repository)
+path = get_lib_path(modname="r.dop.import")
+if path is None:
+    path = os.path.join(os.path.dirname(__file__), "..", "lib_dop")
+sys.path.append(path)
+from r_dop_import_lib import (
+    build_tile_vrt,
+    create_tile_batches,
+    remove_maps,
+    write_stream,
+)
+
+
+class TestRDopImportLib(TestCase):
+    """Test class for the r.dop.import library"""
+
+    pid = os.getpid()
+    tile_size = 1000
+    raster_map = f"test_rdop_lib_rast_{pid}"
+    saved_region = f"test_rdop_lib_region_{pid}"
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def setUpClass(cls):
+        """Create a temporary directory and let grass.fatal raise"""
+        cls.tmp_dir = tempfile.mkdtemp()
+        grass.set_raise_on_error(True)
+
+    @classmethod
+    # pylint: disable=invalid-name
+    def tearDownClass(cls):
+        """Remove the temporary directory"""
+        grass.set_raise_on_error(False)
+        shutil.rmtree(cls.tmp_dir)
+
+    def create_tile(self, name, minx, miny):
+        """Create a GeoTIFF tile and return its path and envelope"""
+        tile_path = os.path.join(self.tmp_dir, f"{name}.tif")
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(25832)
+        res = self.tile_size / 10
+        tile_ds = gdal.GetDriverByName("GTiff").Create(tile_path, 10, 10, 1)
+        tile_ds.SetGeoTransform((minx, res, 0, miny + self.tile_size, 0, -res))
+        tile_ds.SetProjection(srs.ExportToWkt())
+        tile_ds.FlushCache()
+        del tile_ds
+        return tile_path, (
+            minx,
+            minx + self.tile_size,
+            miny,
+            miny + self.tile_size,
+        )
+
+    def test_create_tile_batches(self):
+        """
+        Tests that adjacent tiles are grouped into one metatile and that a
+        tile in another metatile stays alone
+        """
+        tiles = dict(
+            [
+                self.create_tile("tile_1", 0, 0),
+                self.create_tile("tile_2", 1000, 0),
+                self.create_tile("tile_3", 0, 1000),
+                self.create_tile("tile_4", 4000, 0),
+            ],
+        )
+        batches = create_tile_batches(tiles, metatile_size=4)
+        tile_paths = list(tiles)
+        self.assertEqual(
+            batches,
+            [tile_paths[:3], tile_paths[3:]],
+            "Wrong grouping of the tiles into metatiles",
+        )
+
+    def test_build_tile_vrt(self):
+        """
+        Tests that the VRT of a metatile contains all tiles
+        """
+        tiles = dict(
+            [
+                self.create_tile("tile_6", 0, 0),
+                self.create_tile("tile_7", 1000, 0),
+                self.create_tile("tile_8", 0, 1000),
+            ],
+        )
+        vrt_path = os.path.join(self.tmp_dir, "metatile.vrt")
+        build_tile_vrt(list(tiles), vrt_path)
+        vrt_ds = gdal.Open(vrt_path)
+        self.assertIsNotNone(vrt_ds, "VRT of the metatile can not be opened")
+        self.assertEqual(vrt_ds.RasterXSize, 20, "Wrong VRT width")
+        self.assertEqual(vrt_ds.RasterYSize, 20, "Wrong VRT height")
+        del vrt_ds
+
+    def test_build_tile_vrt_missing_tile(self):
+        """
+        Tests that a metatile with a tile which can not be opened fails
+        """
+        tile_path = self.create_tile("tile_5", 8000, 0)[0]
+        with self.assertRaises(ScriptError):
+            build_tile_vrt(
+                [tile_path, os.path.join(self.tmp_dir, "missing.tif")],
+                os.path.join(self.tmp_dir, "missing.vrt"),
+            )
+
+    def test_write_stream(self):
+        """
+        Tests writing an uncompressed and a gzip compressed stream in chunks
+        """
+        data = bytes(range(256)) * 4000
+        out_file = io.BytesIO()
+        write_stream(io.BytesIO(data), out_file, bytearray(1000))
+        self.assertEqual(out_file.getvalue(), data, "Copied data differ")
+
+        out_file = io.BytesIO()
+        write_stream(
+            io.BytesIO(gzip.compress(data)),
+            out_file,
+            bytearray(1000),
+            gzip_stream=True,
+        )
+        self.assertEqual(out_file.getvalue(), data, "Decompressed data differ")
+
+    def test_write_stream_multi_member(self):
+        """
+        Tests that all members of a multi-member gzip stream are written
+        """
+        data = bytes(range(256)) * 4000
+        for chunk_size in (1000, 2**20):
+            out_file = io.BytesIO()
+            write_stream(
+                io.BytesIO(gzip.compress(data) + gzip.compress(data[::-1])),
+                out_file,
+                bytearray(chunk_size),
+                gzip_stream=True,
+            )
+            self.assertEqual(
+                out_file.getvalue(),
+                data + data[::-1],
+                "Not all gzip members are decompressed",
+            )
+
+    def test_write_stream_zero_padding(self):
+        """
+        Tests that zero padding after the last gzip member is ignored
+        """
+        data = bytes(range(256)) * 4000
+        for padding in (16, 3000):
+            out_file = io.BytesIO()
+            write_stream(
+                io.BytesIO(gzip.compress(data) + b"\0" * padding),
+                out_file,
+                bytearray(1000),
+                gzip_stream=True,
+            )
+            self.assertEqual(
+                out_file.getvalue(),
+                data,
+                "Zero padding is not ignored",
+            )
+
+    def test_write_stream_truncated(self):
+        """
+        Tests that a truncated gzip stream raises an EOFError
+        """
+        data = bytes(range(256)) * 4000
+        with self.assertRaises(EOFError):
+            write_stream(
+                io.BytesIO(gzip.compress(data)[:-100]),
+                io.BytesIO(),
+                bytearray(1000),
+                gzip_stream=True,
+            )
+
+    def test_remove_maps(self):
+        """
+        Tests that existing maps and saved regions are removed, not existing
+        ones are ignored and the original region is set again
+        """
+        self.runModule("g.region", save=self.saved_region)
+        orig_region = grass.region()
+        self.runModule("g.region", n="n+100")
+        self.runModule("r.mapcalc", expression=f"{self.raster_map} = 1")
+        remove_maps(
+            rm_rasters=[self.raster_map, f"not_existing_{self.pid}"],
+            orig_region=self.saved_region,
+        )
+        self.assertFalse(
+            grass.find_file(self.raster_map, element="cell")["file"],
+            "Raster map is not removed",
+        )
+        self.assertFalse(
+            grass.find_file(self.saved_region, element="windows")["file"],
+            "Saved region is not removed",
+        )
+        self.assertEqual(
+            grass.region()["n"],
+            orig_region["n"],
+            "Original region is not set",
+        )
+
+
+if __name__ == "__main__":
+    test()